@@ -7,15 +7,17 @@ import os
 import re
 import random
 import time
-from collections import Counter, defaultdict
+import urllib.parse
+from collections import Counter, OrderedDict, defaultdict
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Set, Tuple, Union
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
 
 import aiosqlite
 import psutil
 import telegram
 from langdetect import DetectorFactory, LangDetectException, detect
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Message, Poll, Update
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Message, MessageEntity, Poll, Update
 from telegram.constants import ChatType
 from telegram.ext import (
     ApplicationBuilder,
@@ -31,6 +33,21 @@ try:
 except Exception:  # pragma: no cover - optional dependency at runtime
     OpenAI = None
 
+try:
+    from telegram.ext import AIORateLimiter
+except Exception:  # pragma: no cover - optional dependency at runtime
+    AIORateLimiter = None
+
+try:
+    import uvloop
+except Exception:  # pragma: no cover - optional dependency at runtime
+    uvloop = None
+
+try:
+    import re2
+except Exception:  # pragma: no cover - optional dependency at runtime
+    re2 = None
+
 try:
     from keep_alive import keep_alive
 except Exception:  # pragma: no cover - optional dependency at runtime
@@ -64,7 +81,15 @@ MAX_QUEUE_SIZE = int(os.getenv("MAX_QUEUE_SIZE", "2500"))
 SEND_INTERVAL = float(os.getenv("SEND_INTERVAL", "0.15"))
 FAST_SEND_INTERVAL = float(os.getenv("FAST_SEND_INTERVAL", "0.03"))
 MAX_CONCURRENT_SEND = int(os.getenv("MAX_CONCURRENT_SEND", "8"))
+SENDER_IDLE_TIMEOUT = float(os.getenv("SENDER_IDLE_TIMEOUT", "120"))
+STATS_WRITE_BATCH = max(1, int(os.getenv("STATS_WRITE_BATCH", "100")))
+STATS_FLUSH_INTERVAL = max(0.0, float(os.getenv("STATS_FLUSH_INTERVAL", "1.5")))
+CLEANUP_DELETE_BATCH = max(1, int(os.getenv("CLEANUP_DELETE_BATCH", "500")))
+CHAT_INFO_CACHE_TTL = int(os.getenv("CHAT_INFO_CACHE_TTL", "3600"))
+TARGET_STATE_CACHE_SIZE = max(100, int(os.getenv("TARGET_STATE_CACHE_SIZE", "10000")))
 MAX_MCQ_BLOCK_LINES = int(os.getenv("MAX_MCQ_BLOCK_LINES", "240"))
+PARSE_CACHE_SIZE = max(0, int(os.getenv("PARSE_CACHE_SIZE", "1024")))
+QUIZ_CACHE_SIZE = max(0, int(os.getenv("QUIZ_CACHE_SIZE", "1024")))
 MAX_QUESTION_LENGTH = int(os.getenv("MAX_QUESTION_LENGTH", "300"))
 MAX_OPTION_LENGTH = int(os.getenv("MAX_OPTION_LENGTH", "100"))
 DEFAULT_DELETE_SOURCE = env_bool("DELETE_SOURCE_MESSAGES", "false")
@@ -84,6 +109,12 @@ GROUP_AUTO_PARSE_MCQS = env_bool("GROUP_AUTO_PARSE_MCQS", "true")
 AI_BACKEND_FAILURE_COOLDOWN = max(0, env_int("AI_BACKEND_FAILURE_COOLDOWN", "300"))
 CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "64"))
 GLOBAL_SEND_LIMIT = int(os.getenv("GLOBAL_SEND_LIMIT", "100"))
+GLOBAL_SEND_RATE = float(os.getenv("GLOBAL_SEND_RATE", "30"))
+GROUP_SEND_RATE_PER_MINUTE = float(os.getenv("GROUP_SEND_RATE_PER_MINUTE", "20"))
+USE_PTB_RATE_LIMITER = env_bool("USE_PTB_RATE_LIMITER", "false")
+USE_UVLOOP = env_bool("USE_UVLOOP", "true")
+MCQ_REGEX_ENGINE = os.getenv("MCQ_REGEX_ENGINE", "auto").strip().lower()
+SEND_RETRY_ATTEMPTS = max(1, int(os.getenv("SEND_RETRY_ATTEMPTS", "3")))
 LONG_POLL_TIMEOUT = int(os.getenv("LONG_POLL_TIMEOUT", "30"))
 
 
@@ -150,7 +181,7 @@ TEXTS = {
             "/delivery <fast|rich> - prioritize speed or richer buttons\n"
             "/sharemode <telegram|web|both> - choose how share buttons appear\n"
             "/toggleexplain - show or hide explanation button\n"
-            "/toggleconfirm - show or hide confirmation message\n"
+            "/toggleconfirm - show or hide the buttons under each quiz\n"
             "/tool <mode> - choose the default AI tool\n"
             "/tools - list the available AI tools\n"
             "/ask [tool] <text> - run a smart AI tool on text\n"
@@ -194,7 +225,7 @@ TEXTS = {
             "/delivery <fast|rich> - تفضيل السرعة أو المزايا الغنية\n"
             "/sharemode <telegram|web|both> - اختيار شكل أزرار المشاركة\n"
             "/toggleexplain - إظهار أو إخفاء زر الشرح\n"
-            "/toggleconfirm - إظهار أو إخفاء رسالة التأكيد\n"
+            "/toggleconfirm - إظهار أو إخفاء الأزرار أسفل كل اختبار\n"
             "/tool <mode> - اختيار أداة الذكاء الاصطناعي الافتراضية\n"
             "/tools - عرض أدوات الذكاء الاصطناعي المتاحة\n"
             "/ask [tool] <text> - تشغيل أداة ذكية على النص\n"
@@ -223,7 +254,6 @@ TEXTS = {
         "en": "Queue is full. Try fewer questions or wait a moment.",
         "ar": "قائمة الإرسال ممتلئة حالياً. حاول بعدد أقل أو انتظر قليلاً.",
     },
-    "quiz_sent": {"en": "Quiz published.", "ar": "تم نشر الاختبار."},
     "share_quiz": {"en": "Share Quiz", "ar": "مشاركة الاختبار"},
     "repost_quiz": {"en": "Repost", "ar": "إعادة النشر"},
     "show_explanation": {"en": "Explanation", "ar": "الشرح"},
@@ -260,7 +290,7 @@ TEXTS = {
             "- Preserve question order: {preserve_order}\n"
             "- Web preview URL configured: {web_preview}\n"
             "- Show explanation button: {show_explanation}\n"
-            "- Confirmation message: {confirmation}\n"
+            "- Quiz buttons: {confirmation}\n"
             "- Group fun breaks: {fun_breaks}\n"
             "- Fun interval: {fun_interval}\n"
             "- Fun style: {fun_style}"
@@ -283,7 +313,7 @@ TEXTS = {
             "- الحفاظ على ترتيب الأسئلة: {preserve_order}\n"
             "- رابط المعاينة الخارجية مضبوط: {web_preview}\n"
             "- إظهار زر الشرح: {show_explanation}\n"
-            "- رسالة التأكيد: {confirmation}\n"
+            "- أزرار الاختبار: {confirmation}\n"
             "- الفواصل الترفيهية في المجموعات: {fun_breaks}\n"
             "- معدل الفاصل: {fun_interval}\n"
             "- نمط الفاصل: {fun_style}"
@@ -352,8 +382,8 @@ TEXTS = {
     },
     "toggle_explain_on": {"en": "Explanation button is now enabled.", "ar": "تم تفعيل زر الشرح."},
     "toggle_explain_off": {"en": "Explanation button is now disabled.", "ar": "تم إيقاف زر الشرح."},
-    "toggle_confirm_on": {"en": "Confirmation message is now enabled.", "ar": "تم تفعيل رسالة التأكيد."},
-    "toggle_confirm_off": {"en": "Confirmation message is now disabled.", "ar": "تم إيقاف رسالة التأكيد."},
+    "toggle_confirm_on": {"en": "Quiz buttons are now enabled.", "ar": "تم تفعيل أزرار الاختبار."},
+    "toggle_confirm_off": {"en": "Quiz buttons are now disabled.", "ar": "تم إيقاف أزرار الاختبار."},
     "toggle_ai_on": {"en": "AI is now enabled for your account.", "ar": "تم تفعيل الذكاء الاصطناعي لحسابك."},
     "toggle_ai_off": {"en": "AI is now disabled for your account.", "ar": "تم إيقاف الذكاء الاصطناعي لحسابك."},
     "quiz_loaded": {"en": "Saved quiz loaded into your chat.", "ar": "تم تحميل الاختبار المحفوظ إلى دردشتك."},
@@ -515,6 +545,60 @@ ARABIC_LETTERS = {
     "ئ": "Y",
     "ء": "",
 }
+
+
+MCQ_LABEL_TRANS = str.maketrans(
+    {
+        **{char: digit for char, digit in ARABIC_DIGITS.items() if char != digit},
+        **ARABIC_LETTERS,
+    }
+)
+
+
+def _normalize_mcq_label_chars(raw: str) -> str:
+    return raw.translate(MCQ_LABEL_TRANS).upper().strip()
+
+
+MCQ_LABEL_TABLE: Dict[str, str] = {
+    char: _normalize_mcq_label_chars(char)
+    for char in (
+        "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+        + "".join(ARABIC_DIGITS)
+        + "".join(ARABIC_LETTERS)
+    )
+}
+MCQ_TEXT_ANSWER_LABELS = {
+    "الأول": "A",
+    "أول": "A",
+    "أ": "A",
+    "1": "A",
+    "الثاني": "B",
+    "ثاني": "B",
+    "ب": "B",
+    "2": "B",
+    "الثالث": "C",
+    "ثالث": "C",
+    "ت": "C",
+    "3": "C",
+    "الرابع": "D",
+    "رابع": "D",
+    "ث": "D",
+    "4": "D",
+    "الخامس": "E",
+    "خامس": "E",
+    "ج": "E",
+    "5": "E",
+    "first": "A",
+    "1st": "A",
+    "second": "B",
+    "2nd": "B",
+    "true": "A",
+    "false": "B",
+    "صح": "A",
+    "خطأ": "B",
+    "صحيح": "A",
+    "غلط": "B",
+}
 QUESTION_PREFIXES = ["Q", "Question", "س", "سؤال"]
 ANSWER_KEYWORDS = ["Answer", "Ans", "Correct Answer", "الإجابة", "الجواب", "الإجابة الصحيحة"]
 MCQ_OPTION_PATTERNS = [
@@ -522,19 +606,103 @@ MCQ_OPTION_PATTERNS = [
     r"^\s*[\(\[]\s*([a-zأ-ي0-9])\s*[\)\]]\s*(.+)",
     r"^\s*[\u25cb\u25cf\u25a0\u2022\u00d8\*]\s*([a-zأ-ي0-9])\s*[:.]?\s*(.+)",
     r"^\s*([a-zأ-ي0-9])\s*[\u2013\u2014]\s*(.+)",
-    r"^\s*\b(?:option|اختيار)\s*([a-zأ-ي0-9])\s*[:.]\s*(.+)",
+    r"^\s*(?:option|اختيار)\s*([a-zأ-ي0-9])\s*[:.]\s*(.+)",
 ]
 MCQ_UNLABELED_OPTION_PATTERN = r"^\s*[-*•]\s+(.+)"
-MCQ_BLOCK_START_RE = re.compile(
+
+
+if MCQ_REGEX_ENGINE == "re2" and re2 is None:
+    logger.warning("MCQ_REGEX_ENGINE=re2 but google-re2 is not installed; using Python re")
+
+# RE2's \s, \d and \W are ASCII-only; these keep Python's Unicode meaning.
+RE2_UNICODE_SPACE = r"[\t\n\v\f\r\x1c-\x1f\x85\p{Z}]"
+RE2_UNICODE_NON_WORD = r"[^\p{L}\p{N}_]"
+
+
+def compile_mcq_regex(pattern: str, flags: int = 0):
+    """Compile a parser pattern with RE2 when available, falling back to ``re``.
+
+    RE2 matches in linear time, so hostile pastes cannot trigger backtracking
+    stalls. Patterns RE2 rejects (lookarounds, backreferences) stay on ``re``.
+    MCQ_REGEX_ENGINE=re forces the stdlib engine everywhere.
+    """
+    if re2 is not None and MCQ_REGEX_ENGINE != "re":
+        inline_flags = "".join(flag for bit, flag in ((re.I, "i"), (re.M, "m"), (re.S, "s")) if flags & bit)
+        re2_pattern = re.sub(r"(?<!\\)\\u([0-9a-fA-F]{4})", r"\\x{\1}", pattern)
+        re2_pattern = re2_pattern.replace("\\d", "\\p{Nd}").replace("\\s", RE2_UNICODE_SPACE)
+        re2_pattern = re2_pattern.replace("\\W", RE2_UNICODE_NON_WORD)
+        try:
+            return re2.compile(f"(?{inline_flags}){re2_pattern}" if inline_flags else re2_pattern)
+        except Exception:
+            pass
+    return re.compile(pattern, flags)
+
+
+# One alternation tried in list order; each branch captures (label, text).
+MCQ_OPTION_RE = compile_mcq_regex("|".join(f"(?:{pattern})" for pattern in MCQ_OPTION_PATTERNS), re.I)
+MCQ_UNLABELED_OPTION_RE = compile_mcq_regex(MCQ_UNLABELED_OPTION_PATTERN)
+# Labels accepted by the first option pattern, for the "A) text" scanner.
+MCQ_FAST_LABEL_CHARS = frozenset(
+    "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+    + "".join(chr(code) for code in range(0x0623, 0x064B))
+    + "".join(chr(code) for code in range(0x0660, 0x066A))
+    + "".join(chr(code) for code in range(0x06F0, 0x06FA))
+)
+MCQ_BLOCK_START_RE = compile_mcq_regex(
     r"^\s*(?:(?:Q(?:uestion)?|MCQ|س(?:ؤال)?)\s*[\d\u0660-\u0669\u06f0-\u06f9]*\s*[\).:\-]?"
     r"|[\[(]?\s*[\d\u0660-\u0669\u06f0-\u06f9]+\s*[\])\.:\-])\s*",
     re.I,
 )
-MCQ_EXPLANATION_RE = re.compile(
+MCQ_EXPLANATION_RE = compile_mcq_regex(
     r"^\s*(?:Explanation|Exp|Reason|Note|Reference|Source|شرح|الشرح|تفسير|التفسير|ملاحظة|مرجع)\s*[:\-]",
     re.I,
 )
-MCQ_REFERENCE_ONLY_RE = re.compile(r"^\s*[\[(]\s*[\d\u0660-\u0669\u06f0-\u06f9]{1,4}\s*[\])]\s*$", re.I)
+MCQ_REFERENCE_ONLY_RE = compile_mcq_regex(r"^\s*[\[(]\s*[\d\u0660-\u0669\u06f0-\u06f9]{1,4}\s*[\])]\s*$", re.I)
+MCQ_QUESTION_PREFIXES = QUESTION_PREFIXES + ["MCQ", "Multiple Choice", "اختبار", "اختر", "أسئلة", "Questions", "السؤال"]
+MCQ_ANSWER_KEYWORDS = ANSWER_KEYWORDS + ["Correct", "Solution", "Key", "مفتاح", "صحيح", "صح", "الحل"]
+MCQ_ANSWER_KEYWORD_RE = compile_mcq_regex("|".join(re.escape(keyword.lower()) for keyword in MCQ_ANSWER_KEYWORDS))
+# Branches keep MCQ_QUESTION_PREFIXES order, so the first listed prefix still wins.
+MCQ_QUESTION_PREFIX_RE = compile_mcq_regex(
+    "^(?:" + "|".join(re.escape(prefix) for prefix in MCQ_QUESTION_PREFIXES) + r")\s*[:.\-]?\s*",
+    re.I,
+)
+MCQ_ANSWER_VALUE_RES = [
+    compile_mcq_regex(pattern, re.I)
+    for pattern in (
+        r"[:：]\s*([a-zأ-ي0-9\u0660-\u0669\u06f0-\u06f9])$",
+        r"is\s+([a-zأ-ي0-9])",
+        r"هي\s+([a-zأ-ي0-9])",
+        r"[\(\[]\s*([a-zأ-ي0-9])\s*[\)\]]$",
+        # (?:^|\W) rather than \b: RE2's word boundary ignores Arabic letters.
+        r"(?:^|\W)(?:correct|صح|صحيح)\s*[:\-]\s*([a-zأ-ي0-9])",
+        r"[\u2714\u2705]\s*([a-zأ-ي0-9])",
+    )
+]
+MCQ_ANSWER_PREFIX_RE = compile_mcq_regex(r"^(?:answer|ans|correct answer|الإجابة|الجواب|الحل|solution)\s*[:\-]?\s*", re.I)
+MCQ_TRUE_FALSE_TOKENS = ("true", "false", "صح", "خطأ", "صحيح", "غلط")
+MCQ_ZERO_WIDTH_RE = re.compile(r"[\u200b\u200c\ufeff]")
+MCQ_LABEL_NOISE_RE = re.compile(r"[^A-Z0-9]")
+# Matches may only start at the beginning of a whitespace run. This is the same
+# as the old (?<!\n) guard, but a long run of spaces no longer costs O(n^2).
+MCQ_INLINE_OPTION_RE = re.compile(r"(?<!\s)(\s+[A-Da-dأ-د1-9][).:\-]\s+)")
+MCQ_INLINE_ANSWER_RE = re.compile(r"(?<!\s)(\s+(?:Answer|Ans|Correct Answer|الإجابة|الجواب)\s*[:\-]\s*)", re.I)
+# Fallback split for blocks that fail to parse as a whole. The lookahead's \s*
+# spans newlines, so it finds question starts iter_mcq_blocks does not see
+# (e.g. a numbered line after a blank-looking zero-width line). Lookaheads are
+# not supported by RE2, so this stays on ``re``.
+MCQ_SUB_BLOCK_SPLIT_RE = re.compile(
+    r"(?=^\s*(?:(?:Q(?:uestion)?|MCQ|س(?:ؤال)?)\s*[\d\u0660-\u0669\u06f0-\u06f9]*\s*[\).:\-]?"
+    r"|[\[(]?\s*[\d\u0660-\u0669\u06f0-\u06f9]+\s*[\])\.:\-]))",
+    re.M | re.I,
+)
+WHITESPACE_RUN_RE = re.compile(r"\s+")
+MULTI_SPACE_RE = re.compile(r"\s{2,}")
+ARABIC_CHAR_RE = re.compile(r"[\u0600-\u06FF]")
+INTEGER_ID_RE = re.compile(r"-?\d+")
+CHANNEL_USERNAME_RE = re.compile(r"@[A-Za-z0-9_]{5,}")
+AI_COUNT_PAYLOAD_RE = re.compile(r"^(\d{1,2})\s+(.+)$", re.S)
+JSON_FENCE_OPEN_RE = re.compile(r"^```(?:json)?\s*", re.I)
+JSON_FENCE_CLOSE_RE = re.compile(r"\s*```$")
 
 AI_TOOL_CATALOG = {
     "quiz": {"en": "Quiz generator", "ar": "مولد اختبارات", "desc_en": "Turn text or a topic into MCQs.", "desc_ar": "حوّل النص أو الموضوع إلى أسئلة اختيار من متعدد."},
@@ -849,7 +1017,7 @@ FREE_MODEL_ALIASES = {
 Target = Union[int, str]
 
 
-@dataclass
+@dataclass(frozen=True)
 class UserSettings:
     default_target: Optional[Target]
     default_target_title: str
@@ -903,38 +1071,126 @@ class DB:
 
     @classmethod
     async def conn(cls) -> aiosqlite.Connection:
+        if cls._conn is not None:
+            return cls._conn
         async with cls._lock:
             if cls._conn is None:
                 cls._conn = await aiosqlite.connect(DB_PATH)
                 cls._conn.row_factory = aiosqlite.Row
                 await cls._conn.execute("PRAGMA journal_mode=WAL")
                 await cls._conn.execute("PRAGMA synchronous=NORMAL")
+                await cls._conn.execute("PRAGMA temp_store=MEMORY")
+                await cls._conn.execute("PRAGMA cache_size=-20000")
+                await cls._conn.execute("PRAGMA mmap_size=67108864")
             return cls._conn
 
     @classmethod
     async def close(cls) -> None:
         async with cls._lock:
             if cls._conn is not None:
+                with contextlib.suppress(Exception):
+                    await cls._conn.commit()
+                    await cls._conn.execute("PRAGMA optimize")
                 await cls._conn.close()
                 cls._conn = None
 
 
+class BoundedDict(OrderedDict):
+    """Dict that drops its oldest written entries once it grows past ``maxsize``."""
+
+    def __init__(self, maxsize: int, default_factory=None) -> None:
+        super().__init__()
+        self.maxsize = maxsize
+        self.default_factory = default_factory
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.maxsize:
+            self.popitem(last=False)
+
+    def __missing__(self, key):
+        if self.default_factory is None:
+            raise KeyError(key)
+        value = self.default_factory()
+        self[key] = value
+        return value
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class SendRateLimiter:
+    def __init__(self, global_rate: float, group_rate_per_minute: float) -> None:
+        self.global_bucket = TokenBucket(global_rate, global_rate) if global_rate > 0 else None
+        self.group_rate = group_rate_per_minute / 60.0
+        self.group_capacity = group_rate_per_minute
+        self.target_buckets: Dict[str, TokenBucket] = BoundedDict(TARGET_STATE_CACHE_SIZE)
+        self.paused_until = 0.0
+
+    def pause(self, seconds: float) -> None:
+        # Flood control is account-wide, so one RetryAfter holds every sender.
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def disable(self) -> None:
+        self.global_bucket = None
+        self.group_rate = 0.0
+        self.target_buckets.clear()
+
+    async def acquire(self, target: Target, chat_type: str) -> None:
+        backoff = self.paused_until - time.monotonic()
+        if backoff > 0:
+            await asyncio.sleep(backoff)
+        wait = self.global_bucket.reserve() if self.global_bucket else 0.0
+        if self.group_rate > 0 and chat_type in {ChatType.GROUP, ChatType.SUPERGROUP, ChatType.CHANNEL}:
+            bucket = self.target_buckets.get(str(target))
+            if bucket is None:
+                bucket = TokenBucket(self.group_rate, self.group_capacity)
+                self.target_buckets[str(target)] = bucket
+            wait = max(wait, bucket.reserve())
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
 send_queues: Dict[Target, asyncio.Queue] = defaultdict(lambda: asyncio.Queue(maxsize=MAX_QUEUE_SIZE))
 sender_tasks: Dict[Target, List[asyncio.Task]] = defaultdict(list)
 _openai_clients: Dict[Tuple[str, str], "OpenAI"] = {}
-_ai_backend_failure_cache: Dict[Tuple[str, str, str, str], float] = {}
+# Every entry gets the same cooldown and writes move keys to the end, so the
+# oldest entry is always the first to expire.
+_ai_backend_failure_cache: Dict[Tuple[str, str, str, str], float] = BoundedDict(TARGET_STATE_CACHE_SIZE)
 global_send_semaphore = asyncio.Semaphore(GLOBAL_SEND_LIMIT)
-chat_type_cache: Dict[str, str] = {}
-group_interlude_state: Dict[str, Dict[str, int]] = defaultdict(lambda: {"count": 0, "last": 0})
-group_interlude_lock = asyncio.Lock()
-quiz_answer_rotation_state: Dict[str, int] = defaultdict(int)
-deleted_source_messages: Set[Tuple[int, int]] = set()
+send_rate_limiter = SendRateLimiter(GLOBAL_SEND_RATE, GROUP_SEND_RATE_PER_MINUTE)
+chat_type_cache: Dict[str, str] = BoundedDict(TARGET_STATE_CACHE_SIZE)
+chat_info_cache: Dict[str, Tuple[float, Target, str, str]] = BoundedDict(TARGET_STATE_CACHE_SIZE)
+group_interlude_state: Dict[str, Dict[str, float]] = BoundedDict(TARGET_STATE_CACHE_SIZE, lambda: {"count": 0, "last": float("-inf")})
+quiz_answer_rotation_state: Dict[str, int] = BoundedDict(TARGET_STATE_CACHE_SIZE, int)
+deleted_source_messages: Dict[Tuple[int, int], bool] = BoundedDict(5000)
+stats_total_cache: Dict[str, int] = {}
+user_settings_cache: Dict[int, UserSettings] = BoundedDict(TARGET_STATE_CACHE_SIZE)
+quiz_cache: Dict[str, Tuple[str, List[str], int, str, int]] = BoundedDict(QUIZ_CACHE_SIZE)
+known_channel_ids: Set[int] = set()
+bot_mention_patterns: Dict[str, "re.Pattern[str]"] = {}
+stats_queue: asyncio.Queue = asyncio.Queue()
+background_tasks: Set[asyncio.Task] = set()
 
 
 def get_text(key: str, lang: str = "en", **kwargs) -> str:
-    lang_key = (lang or "en")[:2]
-    text = TEXTS.get(key, {}).get(lang_key) or TEXTS.get(key, {}).get("en", key)
-    return text.format(**kwargs)
+    entry = TEXTS.get(key, {})
+    text = entry.get((lang or "en")[:2]) or entry.get("en", key)
+    # No template uses escaped braces, so skipping format() without kwargs is safe.
+    return text.format(**kwargs) if kwargs else text
 
 
 def log_memory_usage() -> None:
@@ -943,7 +1199,7 @@ def log_memory_usage() -> None:
 
 
 def has_arabic(text: str) -> bool:
-    return bool(re.search(r"[\u0600-\u06FF]", text or ""))
+    return ARABIC_CHAR_RE.search(text or "") is not None
 
 
 def infer_lang(user_lang: Optional[str], sample: str = "") -> str:
@@ -970,17 +1226,7 @@ def extract_message_text(message: Optional[Message]) -> str:
 
 
 def quote_plus(value: str) -> str:
-    safe_chars = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_.~"
-    out: List[str] = []
-    for char in value or "":
-        if char == " ":
-            out.append("+")
-        elif char in safe_chars:
-            out.append(char)
-        else:
-            for byte in char.encode("utf-8"):
-                out.append(f"%{byte:02X}")
-    return "".join(out)
+    return urllib.parse.quote_plus(value or "", safe="")
 
 
 def resolve_chat_title(chat) -> str:
@@ -999,7 +1245,7 @@ def deserialize_target(raw: Optional[str]) -> Optional[Target]:
     if raw is None:
         return None
     raw = raw.strip()
-    if re.fullmatch(r"-?\d+", raw):
+    if INTEGER_ID_RE.fullmatch(raw):
         return int(raw)
     return raw
 
@@ -1012,11 +1258,19 @@ def format_target_label(target: Optional[Target], title: str, lang: str) -> str:
     return str(target)
 
 
+def get_bot_mention_re(bot_username: str) -> "re.Pattern[str]":
+    pattern = bot_mention_patterns.get(bot_username)
+    if pattern is None:
+        pattern = re.compile(rf"@{re.escape(bot_username)}", re.I)
+        bot_mention_patterns[bot_username] = pattern
+    return pattern
+
+
 def remove_bot_mentions(text: str, bot_username: str) -> str:
     if not text:
         return text
-    cleaned = re.sub(rf"@{re.escape(bot_username)}", "", text, flags=re.I)
-    cleaned = re.sub(r"\s{2,}", " ", cleaned)
+    cleaned = get_bot_mention_re(bot_username).sub("", text)
+    cleaned = MULTI_SPACE_RE.sub(" ", cleaned)
     return cleaned.strip()
 
 
@@ -1028,33 +1282,37 @@ def parse_target_reference(raw: str, current_chat_id: Optional[int] = None) -> T
         if current_chat_id is None:
             raise ValueError("missing current chat")
         return current_chat_id
-    if re.fullmatch(r"-?\d+", value):
+    if INTEGER_ID_RE.fullmatch(value):
         return int(value)
-    if re.fullmatch(r"@[A-Za-z0-9_]{5,}", value):
+    if CHANNEL_USERNAME_RE.fullmatch(value):
         return value
     raise ValueError("invalid target")
 
 
 def parse_ai_count_and_payload(text: str, default_count: int) -> Tuple[int, str]:
     payload = (text or "").strip()
-    match = re.match(r"^(\d{1,2})\s+(.+)$", payload, flags=re.S)
+    match = AI_COUNT_PAYLOAD_RE.match(payload)
     if not match:
         return default_count, payload
     count = max(1, min(10, int(match.group(1))))
     return count, match.group(2).strip()
 
 
+INLINE_AI_PREFIXES = (
+    ("topic", "ai:"),
+    ("topic", "موضوع:"),
+    ("text", "quizify:"),
+    ("text", "نص:"),
+)
+INLINE_AI_PREFIX_MAX_LEN = max(len(prefix) for _, prefix in INLINE_AI_PREFIXES)
+
+
 def detect_inline_ai_request(text: str) -> Optional[Tuple[str, str]]:
     raw = (text or "").strip()
-    lower = raw.lower()
-    prefixes = [
-        ("topic", "ai:"),
-        ("topic", "موضوع:"),
-        ("text", "quizify:"),
-        ("text", "نص:"),
-    ]
-    for mode, prefix in prefixes:
-        if lower.startswith(prefix.lower()):
+    # Only the head can match a prefix; avoid lowercasing whole MCQ batches.
+    head = raw[:INLINE_AI_PREFIX_MAX_LEN].lower()
+    for mode, prefix in INLINE_AI_PREFIXES:
+        if head.startswith(prefix):
             return mode, raw[len(prefix):].strip()
     return None
 
@@ -1085,26 +1343,38 @@ def validate_mcq(question: str, options: List[str]) -> bool:
     return True
 
 
+def normalize_mcq_label(raw: str) -> str:
+    label = MCQ_LABEL_TABLE.get(raw)
+    if label is None:
+        label = _normalize_mcq_label_chars(raw)
+    return label
+
+
 def is_mcq_question_start(line: str) -> bool:
     return bool(MCQ_BLOCK_START_RE.match((line or "").strip()))
 
 
+def match_mcq_option(line: str) -> Optional[Tuple[str, str]]:
+    if len(line) > 2 and line[0] in MCQ_FAST_LABEL_CHARS and line[1] in ").:-":
+        text = line[2:].lstrip()
+        if text:
+            return line[0], text
+    match = MCQ_OPTION_RE.match(line)
+    if not match:
+        return None
+    text_group = match.lastindex or 0
+    return match.group(text_group - 1), match.group(text_group)
+
+
 def is_mcq_option_line(line: str) -> bool:
-    stripped = (line or "").strip()
-    for pattern in MCQ_OPTION_PATTERNS:
-        if re.match(pattern, stripped, re.I | re.U):
-            return True
-    return False
+    return match_mcq_option((line or "").strip()) is not None
 
 
 def is_mcq_answer_line(line: str) -> bool:
     lowered = (line or "").strip().lower()
     if not lowered:
         return False
-    for keyword in ANSWER_KEYWORDS + ["Correct", "Solution", "Key", "مفتاح", "صحيح", "صح", "الحل"]:
-        if keyword.lower() in lowered:
-            return True
-    return False
+    return MCQ_ANSWER_KEYWORD_RE.search(lowered) is not None
 
 
 def strip_mcq_noise(lines: List[str]) -> List[str]:
@@ -1133,14 +1403,24 @@ def looks_like_mcq_batch(text: str) -> bool:
     if not raw:
         return False
     lines = [line.strip() for line in raw.splitlines() if line.strip()]
-    option_hits = sum(1 for line in lines if is_mcq_option_line(line))
-    answer_hits = sum(1 for line in lines if is_mcq_answer_line(line))
-    question_hits = sum(1 for line in lines if is_mcq_question_start(line))
-    return option_hits >= 2 and (answer_hits >= 1 or question_hits >= 1)
+    if len(lines) < 2:
+        return False
+    # Stop as soon as the verdict is known, and skip checks that can no longer
+    # change it; ordinary group chatter is the common case here.
+    option_hits = 0
+    anchored = False
+    for line in lines:
+        if option_hits < 2 and is_mcq_option_line(line):
+            option_hits += 1
+        if not anchored and (is_mcq_answer_line(line) or is_mcq_question_start(line)):
+            anchored = True
+        if anchored and option_hits >= 2:
+            return True
+    return False
 
 
 def parse_single_mcq(block: str) -> Optional[Tuple[str, List[str], int]]:
-    block = re.sub(r"[\u200b\u200c\ufeff]", "", block)
+    block = MCQ_ZERO_WIDTH_RE.sub("", block)
     lines = strip_mcq_noise([line.strip() for line in block.splitlines() if line.strip()])
     if len(lines) > MAX_MCQ_BLOCK_LINES:
         return None
@@ -1151,66 +1431,36 @@ def parse_single_mcq(block: str) -> Optional[Tuple[str, List[str], int]]:
     answer_line = ""
     unlabeled_options: List[str] = []
 
-    question_prefixes = QUESTION_PREFIXES + ["MCQ", "Multiple Choice", "اختبار", "اختر", "أسئلة", "Questions", "السؤال"]
-    answer_keywords = ANSWER_KEYWORDS + ["Correct", "Solution", "Key", "مفتاح", "صحيح", "صح", "الحل"]
-
     for line in lines:
         if question is None:
-            question_candidate = re.sub(
-                r"^\s*(?:(?:Q(?:uestion)?|MCQ|س(?:ؤال)?)\s*[\d\u0660-\u0669\u06f0-\u06f9]*\s*[\).:\-]?"
-                r"|[\[(]?\s*[\d\u0660-\u0669\u06f0-\u06f9]+\s*[\])\.:\-])\s*",
-                "",
-                line,
-                flags=re.I,
-            ).strip()
+            question_candidate = MCQ_BLOCK_START_RE.sub("", line, count=1).strip()
             if question_candidate and question_candidate != line and not is_mcq_option_line(question_candidate):
                 question = question_candidate
             else:
-                for prefix in question_prefixes:
-                    if line.lower().startswith(prefix.lower()):
-                        question = re.sub(f"^{re.escape(prefix)}\\s*[:.\\-]?\\s*", "", line, flags=re.I).strip()
-                        break
+                prefix_match = MCQ_QUESTION_PREFIX_RE.match(line)
+                if prefix_match:
+                    question = line[prefix_match.end():].strip()
             if question is not None:
                 continue
 
-        matched = False
-        for pattern in MCQ_OPTION_PATTERNS:
-            match = re.match(pattern, line, re.I | re.U)
-            if match:
-                label, text = match.groups()
-                label = "".join(ARABIC_DIGITS.get(char, char) for char in label).upper()
-                label = "".join(ARABIC_LETTERS.get(char, char) for char in label).strip()
-                if label:
-                    options.append((label, text.strip()))
-                    matched = True
-                    break
-        if matched:
-            continue
+        option_match = match_mcq_option(line)
+        if option_match:
+            label = normalize_mcq_label(option_match[0])
+            if label:
+                options.append((label, option_match[1].strip()))
+                continue
 
-        unlabeled_match = re.match(MCQ_UNLABELED_OPTION_PATTERN, line, re.U)
+        unlabeled_match = MCQ_UNLABELED_OPTION_RE.match(line)
         if unlabeled_match:
             unlabeled_options.append(unlabeled_match.group(1).strip())
             continue
 
-        if answer_label is None:
-            for keyword in answer_keywords:
-                if keyword.lower() in line.lower():
-                    answer_line = line.strip()
-                    patterns = [
-                        r"[:：]\s*([a-zأ-ي0-9\u0660-\u0669\u06f0-\u06f9])$",
-                        r"is\s+([a-zأ-ي0-9])",
-                        r"هي\s+([a-zأ-ي0-9])",
-                        r"[\(\[]\s*([a-zأ-ي0-9])\s*[\)\]]$",
-                        r"\b(?:correct|صح|صحيح)\s*[:\-]\s*([a-zأ-ي0-9])",
-                        r"[\u2714\u2705]\s*([a-zأ-ي0-9])",
-                    ]
-                    for pattern in patterns:
-                        match = re.search(pattern, line, re.I | re.U)
-                        if match:
-                            answer_label = match.group(1)
-                            answer_label = "".join(ARABIC_DIGITS.get(char, char) for char in answer_label).upper()
-                            answer_label = "".join(ARABIC_LETTERS.get(char, char) for char in answer_label).strip()
-                            break
+        if answer_label is None and MCQ_ANSWER_KEYWORD_RE.search(line.lower()):
+            answer_line = line.strip()
+            for pattern in MCQ_ANSWER_VALUE_RES:
+                match = pattern.search(line)
+                if match:
+                    answer_label = normalize_mcq_label(match.group(1))
                     break
 
     if not options and 2 <= len(unlabeled_options) <= 10:
@@ -1223,7 +1473,7 @@ def parse_single_mcq(block: str) -> Optional[Tuple[str, List[str], int]]:
 
     if question and not options and answer_line:
         lower_answer_line = answer_line.lower()
-        if any(token in lower_answer_line for token in ["true", "false", "صح", "خطأ", "صحيح", "غلط"]):
+        if any(token in lower_answer_line for token in MCQ_TRUE_FALSE_TOKENS):
             if has_arabic(question + answer_line):
                 options = [("A", "صح"), ("B", "خطأ")]
             else:
@@ -1239,57 +1489,26 @@ def parse_single_mcq(block: str) -> Optional[Tuple[str, List[str], int]]:
     label_to_idx: Dict[str, int] = {}
     option_text_to_idx: Dict[str, int] = {}
     for idx, (label, option_text) in enumerate(options):
-        clean_label = re.sub(r"[^A-Z0-9]", "", label)
+        clean_label = MCQ_LABEL_NOISE_RE.sub("", label)
         label_to_idx[clean_label] = idx
         if clean_label.isdigit() and 1 <= int(clean_label) <= 26:
             label_to_idx[chr(64 + int(clean_label))] = idx
-        option_text_to_idx[re.sub(r"\s+", " ", option_text).strip().lower()] = idx
+        option_text_to_idx[WHITESPACE_RUN_RE.sub(" ", option_text).strip().lower()] = idx
 
     if answer_label:
-        clean_answer = re.sub(r"[^A-Z0-9]", "", answer_label)
+        clean_answer = MCQ_LABEL_NOISE_RE.sub("", answer_label)
         if clean_answer in label_to_idx:
             return question, [item for _, item in options], label_to_idx[clean_answer]
     else:
         clean_answer = ""
 
-    text_answers = {
-        "الأول": "A",
-        "أول": "A",
-        "أ": "A",
-        "1": "A",
-        "الثاني": "B",
-        "ثاني": "B",
-        "ب": "B",
-        "2": "B",
-        "الثالث": "C",
-        "ثالث": "C",
-        "ت": "C",
-        "3": "C",
-        "الرابع": "D",
-        "رابع": "D",
-        "ث": "D",
-        "4": "D",
-        "الخامس": "E",
-        "خامس": "E",
-        "ج": "E",
-        "5": "E",
-        "first": "A",
-        "1st": "A",
-        "second": "B",
-        "2nd": "B",
-        "true": "A",
-        "false": "B",
-        "صح": "A",
-        "خطأ": "B",
-        "صحيح": "A",
-        "غلط": "B",
-    }
-    if clean_answer in text_answers and text_answers[clean_answer] in label_to_idx:
-        return question, [item for _, item in options], label_to_idx[text_answers[clean_answer]]
+    text_label = MCQ_TEXT_ANSWER_LABELS.get(clean_answer)
+    if text_label in label_to_idx:
+        return question, [item for _, item in options], label_to_idx[text_label]
 
     if answer_line:
-        normalized_answer_line = re.sub(r"^(?:answer|ans|correct answer|الإجابة|الجواب|الحل|solution)\s*[:\-]?\s*", "", answer_line, flags=re.I).strip().lower()
-        normalized_answer_line = re.sub(r"\s+", " ", normalized_answer_line)
+        normalized_answer_line = MCQ_ANSWER_PREFIX_RE.sub("", answer_line, count=1).strip().lower()
+        normalized_answer_line = WHITESPACE_RUN_RE.sub(" ", normalized_answer_line)
         if normalized_answer_line in option_text_to_idx:
             return question, [item for _, item in options], option_text_to_idx[normalized_answer_line]
         for option_text, idx in option_text_to_idx.items():
@@ -1298,50 +1517,73 @@ def parse_single_mcq(block: str) -> Optional[Tuple[str, List[str], int]]:
     return None
 
 
-def parse_mcq(text: str) -> List[Tuple[str, List[str], int]]:
-    text = (text or "").strip()
-    if "|" in text:
-        text = re.sub(r"\s*\|\s*", "\n", text)
-    text = re.sub(r"(?<!\n)(\s+[A-Da-dأ-د1-9][).:\-]\s+)", lambda m: "\n" + m.group(1).strip() + " ", text)
-    text = re.sub(r"(?<!\n)(\s+(?:Answer|Ans|Correct Answer|الإجابة|الجواب)\s*[:\-]\s*)", lambda m: "\n" + m.group(1).strip() + " ", text, flags=re.I)
+def mentions_true_false(text: str) -> bool:
+    # A single line can only become a true/false quiz, so a lone line without
+    # one of these tokens is skipped before the full block parser runs.
+    lowered = MCQ_ZERO_WIDTH_RE.sub("", text).lower()
+    return any(token in lowered for token in MCQ_TRUE_FALSE_TOKENS)
 
-    blocks: List[str] = []
+
+def iter_mcq_blocks(lines: List[str]) -> Iterator[str]:
     current: List[str] = []
-    for line in text.splitlines():
+    for line in lines:
         stripped = line.strip()
         if not stripped:
             if current:
-                blocks.append("\n".join(current))
+                yield "\n".join(current)
                 current = []
             continue
         if current and is_mcq_question_start(stripped):
-            blocks.append("\n".join(current))
+            yield "\n".join(current)
             current = [stripped]
         else:
             current.append(stripped)
     if current:
-        blocks.append("\n".join(current))
+        yield "\n".join(current)
 
-    parsed: List[Tuple[str, List[str], int]] = []
-    for block in blocks:
+
+def parse_mcq(text: str) -> List[Tuple[str, List[str], int]]:
+    return [(question, list(options), correct_index) for question, options, correct_index in _parse_mcq_cached(text or "")]
+
+
+# Re-sent or retried batches hit the cache; results are tuples so cached
+# entries cannot be mutated by callers.
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_mcq_cached(text: str) -> Tuple[Tuple[str, Tuple[str, ...], int], ...]:
+    text = text.strip()
+    if "|" in text:
+        text = "\n".join(part.strip() for part in text.split("|"))
+    text = MCQ_INLINE_OPTION_RE.sub(lambda m: "\n" + m.group(1).strip() + " ", text)
+    text = MCQ_INLINE_ANSWER_RE.sub(lambda m: "\n" + m.group(1).strip() + " ", text)
+
+    lines = text.splitlines()
+    if len(lines) < 2 and not mentions_true_false(text):
+        return ()
+
+    parsed: List[Tuple[str, Tuple[str, ...], int]] = []
+    for block in iter_mcq_blocks(lines):
+        if "\n" not in block and not mentions_true_false(block):
+            continue
         item = parse_single_mcq(block)
         if item:
-            parsed.append(item)
+            question, options, correct_index = item
+            parsed.append((question, tuple(options), correct_index))
             continue
-        sub_blocks = re.split(r"(?=^\s*(?:(?:Q(?:uestion)?|MCQ|س(?:ؤال)?)\s*[\d\u0660-\u0669\u06f0-\u06f9]*\s*[\).:\-]?|[\[(]?\s*[\d\u0660-\u0669\u06f0-\u06f9]+\s*[\])\.:\-]))", block, flags=re.M | re.I)
-        for sub_block in sub_blocks:
+        for sub_block in MCQ_SUB_BLOCK_SPLIT_RE.split(block):
             if sub_block.strip():
                 sub_item = parse_single_mcq(sub_block)
                 if sub_item:
-                    parsed.append(sub_item)
-    return parsed
+                    question, options, correct_index = sub_item
+                    parsed.append((question, tuple(options), correct_index))
+    return tuple(parsed)
 
 
-async def ensure_column(conn: aiosqlite.Connection, table: str, column: str, definition: str) -> None:
+async def ensure_columns(conn: aiosqlite.Connection, table: str, columns: List[Tuple[str, str]]) -> None:
     rows = await (await conn.execute(f"PRAGMA table_info({table})")).fetchall()
     existing = {row["name"] for row in rows}
-    if column not in existing:
-        await conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    for column, definition in columns:
+        if column not in existing:
+            await conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
 
 
 async def init_db() -> None:
@@ -1386,24 +1628,55 @@ async def init_db() -> None:
         "title TEXT DEFAULT '', "
         "sent INTEGER DEFAULT 0)"
     )
-    await ensure_column(conn, "quizzes", "explanation", "TEXT DEFAULT ''")
-    await ensure_column(conn, "quizzes", "created_at", "INTEGER DEFAULT 0")
-    await ensure_column(conn, "user_settings", "ai_provider", "TEXT DEFAULT 'auto'")
-    await ensure_column(conn, "user_settings", "preferred_language", "TEXT DEFAULT 'auto'")
-    await ensure_column(conn, "user_settings", "ai_specialty", "TEXT DEFAULT ''")
-    await ensure_column(conn, "user_settings", "delivery_mode", "TEXT DEFAULT 'rich'")
-    await ensure_column(conn, "user_settings", "share_mode", "TEXT DEFAULT 'both'")
-    await ensure_column(conn, "user_settings", "show_explanation", "INTEGER DEFAULT 1")
-    await ensure_column(conn, "user_settings", "confirmation_message", "INTEGER DEFAULT 1")
-    await ensure_column(conn, "user_settings", "ai_tool_mode", "TEXT DEFAULT 'quiz'")
-    await ensure_column(conn, "user_settings", "fun_breaks", "INTEGER DEFAULT 0")
-    await ensure_column(conn, "user_settings", "fun_interval", "INTEGER DEFAULT 6")
-    await ensure_column(conn, "user_settings", "fun_style", "TEXT DEFAULT 'mixed'")
+    await ensure_columns(
+        conn,
+        "quizzes",
+        [
+            ("explanation", "TEXT DEFAULT ''"),
+            ("created_at", "INTEGER DEFAULT 0"),
+        ],
+    )
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_quizzes_created_at ON quizzes(created_at)")
+    await ensure_columns(
+        conn,
+        "user_settings",
+        [
+            ("ai_provider", "TEXT DEFAULT 'auto'"),
+            ("preferred_language", "TEXT DEFAULT 'auto'"),
+            ("ai_specialty", "TEXT DEFAULT ''"),
+            ("delivery_mode", "TEXT DEFAULT 'rich'"),
+            ("share_mode", "TEXT DEFAULT 'both'"),
+            ("show_explanation", "INTEGER DEFAULT 1"),
+            ("confirmation_message", "INTEGER DEFAULT 1"),
+            ("ai_tool_mode", "TEXT DEFAULT 'quiz'"),
+            ("fun_breaks", "INTEGER DEFAULT 0"),
+            ("fun_interval", "INTEGER DEFAULT 6"),
+            ("fun_style", "TEXT DEFAULT 'mixed'"),
+        ],
+    )
     await conn.commit()
+    rows = await (await conn.execute("SELECT chat_id FROM known_channels")).fetchall()
+    known_channel_ids.update(int(row["chat_id"]) for row in rows)
+    # Long-lived connection: let SQLite refresh planner stats where they are stale.
+    with contextlib.suppress(aiosqlite.Error):
+        await conn.execute("PRAGMA optimize=0x10002")
     logger.info("DB initialized")
 
 
+async def remember_known_channel(conn: aiosqlite.Connection, chat_id: int, title: str) -> bool:
+    if chat_id in known_channel_ids:
+        return False
+    await conn.execute("INSERT OR IGNORE INTO known_channels(chat_id, title) VALUES (?, ?)", (chat_id, title or ""))
+    known_channel_ids.add(chat_id)
+    return True
+
+
 async def get_user_settings(user_id: int) -> UserSettings:
+    # Settings are read for every message and every sent poll but only change
+    # through update_user_settings, which drops the cached entry.
+    cached = user_settings_cache.get(user_id)
+    if cached is not None:
+        return cached
     conn = await DB.conn()
     row = await (await conn.execute("SELECT * FROM user_settings WHERE user_id=?", (user_id,))).fetchone()
     if row is None:
@@ -1427,7 +1700,7 @@ async def get_user_settings(user_id: int) -> UserSettings:
         await conn.commit()
         row = await (await conn.execute("SELECT * FROM user_settings WHERE user_id=?", (user_id,))).fetchone()
 
-    return UserSettings(
+    settings = UserSettings(
         default_target=deserialize_target(row["default_target"]),
         default_target_title=row["default_target_title"] or "",
         delete_source=bool(row["delete_source"]),
@@ -1446,6 +1719,8 @@ async def get_user_settings(user_id: int) -> UserSettings:
         fun_interval=max(1, min(30, int(row["fun_interval"] or 6))),
         fun_style=(row["fun_style"] or "mixed").strip().lower() or "mixed",
     )
+    user_settings_cache[user_id] = settings
+    return settings
 
 
 async def update_user_settings(user_id: int, **fields) -> UserSettings:
@@ -1482,87 +1757,140 @@ async def update_user_settings(user_id: int, **fields) -> UserSettings:
     if values["fun_style"] not in FUN_STYLE_CHOICES:
         values["fun_style"] = "mixed"
     conn = await DB.conn()
+    # Upsert in place: REPLACE deletes and re-inserts the row, rewriting every
+    # index entry for what is usually a one-column change.
+    columns = list(values)
     await conn.execute(
-        "REPLACE INTO user_settings("
-        "user_id, default_target, default_target_title, delete_source, ai_enabled, ai_model, ai_provider, ai_count, preferred_language, ai_specialty, delivery_mode, share_mode, show_explanation, confirmation_message, ai_tool_mode, fun_breaks, fun_interval, fun_style"
-        ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-        (
-            user_id,
-            values["default_target"],
-            values["default_target_title"],
-            values["delete_source"],
-            values["ai_enabled"],
-            values["ai_model"],
-            values["ai_provider"],
-            values["ai_count"],
-            values["preferred_language"],
-            values["ai_specialty"],
-            values["delivery_mode"],
-            values["share_mode"],
-            values["show_explanation"],
-            values["confirmation_message"],
-            values["ai_tool_mode"],
-            values["fun_breaks"],
-            values["fun_interval"],
-            values["fun_style"],
-        ),
+        f"INSERT INTO user_settings(user_id, {', '.join(columns)}) VALUES (?{', ?' * len(columns)}) "
+        f"ON CONFLICT(user_id) DO UPDATE SET {', '.join(f'{column}=excluded.{column}' for column in columns)}",
+        (user_id, *values.values()),
     )
-    if values["default_target"] and re.fullmatch(r"-?\d+", values["default_target"]):
+    if values["default_target"] and INTEGER_ID_RE.fullmatch(values["default_target"]):
         await conn.execute(
-            "REPLACE INTO default_channels(user_id, chat_id, title) VALUES (?, ?, ?)",
+            "INSERT INTO default_channels(user_id, chat_id, title) VALUES (?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET chat_id=excluded.chat_id, title=excluded.title",
             (user_id, int(values["default_target"]), values["default_target_title"]),
         )
     else:
         await conn.execute("DELETE FROM default_channels WHERE user_id=?", (user_id,))
     await conn.commit()
+    user_settings_cache.pop(user_id, None)
     return await get_user_settings(user_id)
 
 
 async def save_quiz(quiz_id: str, question: str, options: List[str], correct_option: int, user_id: int, explanation: str = "") -> None:
     conn = await DB.conn()
     await conn.execute(
-        "INSERT OR IGNORE INTO quizzes(quiz_id, question, options, correct_option, user_id, explanation, created_at) "
-        "VALUES (?, ?, ?, ?, ?, ?, ?)",
-        (quiz_id, question, get_options_blob(options), correct_option, user_id, explanation, int(time.time())),
+        "INSERT INTO quizzes(quiz_id, question, options, correct_option, user_id, explanation, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(quiz_id) DO UPDATE SET explanation=excluded.explanation WHERE excluded.explanation <> ''",
+        (quiz_id, question, get_options_blob(options), correct_option, user_id, explanation or "", int(time.time())),
     )
-    if explanation:
-        await conn.execute("UPDATE quizzes SET explanation=? WHERE quiz_id=?", (explanation, quiz_id))
     await conn.commit()
+    quiz_cache.pop(quiz_id, None)
 
 
 async def fetch_quiz(quiz_id: str) -> Optional[Tuple[str, List[str], int, str, int]]:
+    # Shared links and repost/explain buttons hit the same few quizzes repeatedly.
+    cached = quiz_cache.get(quiz_id)
+    if cached is not None:
+        return cached
     conn = await DB.conn()
     row = await (await conn.execute("SELECT * FROM quizzes WHERE quiz_id=?", (quiz_id,))).fetchone()
     if row is None:
         return None
-    return (
+    quiz = (
         row["question"],
         parse_options_blob(row["options"]),
         int(row["correct_option"]),
         row["explanation"] or "",
         int(row["user_id"] or 0),
     )
+    quiz_cache[quiz_id] = quiz
+    return quiz
 
 
 async def record_stats(user_id: int, target: Target, chat_type: str, title: str) -> None:
+    stats_queue.put_nowait((user_id, target, chat_type or "", title or ""))
+
+
+async def write_stats_batch(batch: List[Tuple[int, Target, str, str]]) -> None:
+    # Fold the batch into one delta per row so a burst costs one upsert per
+    # user/target instead of one per sent poll.
+    user_counts: Counter[int] = Counter(user_id for user_id, _, _, _ in batch if user_id)
+    target_counts: Dict[str, Tuple[str, str, int]] = {}
+    channel_counts: Counter[int] = Counter()
+    channel_titles: Dict[int, str] = {}
+    for _, target, chat_type, title in batch:
+        key = str(target)
+        previous = target_counts.get(key)
+        target_counts[key] = (chat_type, title, (previous[2] if previous else 0) + 1)
+        if isinstance(target, int) and key.startswith("-100"):
+            channel_counts[target] += 1
+            channel_titles.setdefault(target, title)
+
     conn = await DB.conn()
-    if user_id:
-        await conn.execute("INSERT OR IGNORE INTO user_stats(user_id, sent) VALUES (?, 0)", (user_id,))
-        await conn.execute("UPDATE user_stats SET sent=sent+1 WHERE user_id=?", (user_id,))
-    target_id = str(target)
-    await conn.execute(
-        "INSERT OR IGNORE INTO target_stats(target_id, chat_type, title, sent) VALUES (?, ?, ?, ?)",
-        (target_id, chat_type or "", title or "", 0),
-    )
-    await conn.execute(
-        "UPDATE target_stats SET sent=sent+1, chat_type=?, title=? WHERE target_id=?",
-        (chat_type or "", title or "", target_id),
-    )
-    if isinstance(target, int) and str(target).startswith("-100"):
-        await conn.execute("INSERT OR IGNORE INTO channel_stats(chat_id, sent) VALUES (?, 0)", (target,))
-        await conn.execute("UPDATE channel_stats SET sent=sent+1 WHERE chat_id=?", (target,))
-        await conn.execute("INSERT OR IGNORE INTO known_channels(chat_id, title) VALUES (?, ?)", (target, title or ""))
+    # Other coroutines write on this same connection, so a failure must only
+    # undo this batch's rows, never the whole connection's transaction.
+    await conn.execute("SAVEPOINT stats_batch")
+    new_channel_ids: List[int] = []
+    try:
+        if user_counts:
+            await conn.executemany(
+                "INSERT INTO user_stats(user_id, sent) VALUES (?, ?) ON CONFLICT(user_id) DO UPDATE SET sent=sent+excluded.sent",
+                list(user_counts.items()),
+            )
+        await conn.executemany(
+            "INSERT INTO target_stats(target_id, chat_type, title, sent) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(target_id) DO UPDATE SET sent=sent+excluded.sent, chat_type=excluded.chat_type, title=excluded.title",
+            [(key, chat_type, title, sent) for key, (chat_type, title, sent) in target_counts.items()],
+        )
+        if channel_counts:
+            await conn.executemany(
+                "INSERT INTO channel_stats(chat_id, sent) VALUES (?, ?) ON CONFLICT(chat_id) DO UPDATE SET sent=sent+excluded.sent",
+                list(channel_counts.items()),
+            )
+            for chat_id, title in channel_titles.items():
+                if await remember_known_channel(conn, chat_id, title):
+                    new_channel_ids.append(chat_id)
+    except BaseException:
+        known_channel_ids.difference_update(new_channel_ids)
+        with contextlib.suppress(Exception):
+            await conn.execute("ROLLBACK TO stats_batch")
+            await conn.execute("RELEASE stats_batch")
+        raise
+    await conn.execute("RELEASE stats_batch")
     await conn.commit()
+    stats_total_cache.clear()
+
+
+async def stats_writer() -> None:
+    while True:
+        batch = [await stats_queue.get()]
+        if batch[0] is not None and STATS_FLUSH_INTERVAL and stats_queue.qsize() < STATS_WRITE_BATCH:
+            # Let a burst accumulate so it lands in one transaction.
+            await asyncio.sleep(STATS_FLUSH_INTERVAL)
+        while len(batch) < STATS_WRITE_BATCH and not stats_queue.empty():
+            batch.append(stats_queue.get_nowait())
+        pending = [entry for entry in batch if entry is not None]
+        if pending:
+            try:
+                await write_stats_batch(pending)
+            except Exception as exc:
+                logger.exception("Stats write failed for %s entries: %s", len(pending), exc)
+        if len(pending) != len(batch):
+            return
+
+
+async def fetch_total_sent() -> int:
+    cached = stats_total_cache.get("sent")
+    if cached is not None:
+        return cached
+    conn = await DB.conn()
+    total_row = await (await conn.execute("SELECT COALESCE(SUM(sent), 0) AS sent FROM target_stats")).fetchone()
+    total = int(total_row["sent"]) if total_row else 0
+    stats_total_cache["sent"] = total
+    return total
 
 
 def resolve_ai_runtime(settings: Optional[UserSettings] = None, model_override: Optional[str] = None) -> Tuple[Optional[str], Optional[str], str]:
@@ -1619,25 +1947,29 @@ def _ai_backend_signature(settings: Optional[UserSettings] = None, model_overrid
 
 
 def _prune_ai_backend_failures() -> None:
-    if not _ai_backend_failure_cache:
-        return
-    now = time.time()
-    for key, expires_at in list(_ai_backend_failure_cache.items()):
-        if expires_at <= now:
-            _ai_backend_failure_cache.pop(key, None)
+    now = time.monotonic()
+    while _ai_backend_failure_cache:
+        key = next(iter(_ai_backend_failure_cache))
+        if _ai_backend_failure_cache[key] > now:
+            return
+        _ai_backend_failure_cache.pop(key, None)
 
 
 def ai_backend_temporarily_disabled(settings: Optional[UserSettings] = None, model_override: Optional[str] = None) -> bool:
     if AI_BACKEND_FAILURE_COOLDOWN <= 0:
         return False
     _prune_ai_backend_failures()
-    return _ai_backend_failure_cache.get(_ai_backend_signature(settings, model_override), 0.0) > time.time()
+    # Whatever survives the prune has not expired yet, so membership is enough
+    # and the signature is only resolved when some backend is cooling down.
+    if not _ai_backend_failure_cache:
+        return False
+    return _ai_backend_signature(settings, model_override) in _ai_backend_failure_cache
 
 
 def mark_ai_backend_failed(settings: Optional[UserSettings] = None, model_override: Optional[str] = None) -> None:
     if AI_BACKEND_FAILURE_COOLDOWN <= 0:
         return
-    _ai_backend_failure_cache[_ai_backend_signature(settings, model_override)] = time.time() + AI_BACKEND_FAILURE_COOLDOWN
+    _ai_backend_failure_cache[_ai_backend_signature(settings, model_override)] = time.monotonic() + AI_BACKEND_FAILURE_COOLDOWN
 
 
 def clear_ai_backend_failure(settings: Optional[UserSettings] = None, model_override: Optional[str] = None) -> None:
@@ -1717,8 +2049,8 @@ def normalize_ai_correct_option(value, options_len: int) -> Optional[int]:
 def clean_json_text(raw: str) -> str:
     cleaned = (raw or "").strip()
     if cleaned.startswith("```"):
-        cleaned = re.sub(r"^```(?:json)?\s*", "", cleaned, flags=re.I)
-        cleaned = re.sub(r"\s*```$", "", cleaned)
+        cleaned = JSON_FENCE_OPEN_RE.sub("", cleaned)
+        cleaned = JSON_FENCE_CLOSE_RE.sub("", cleaned)
     return cleaned.strip()
 
 
@@ -2033,7 +2365,7 @@ def local_study_pack(payload: str, lang: str) -> str:
     if not text:
         return get_text("study_help", lang)
 
-    sentences = [s.strip() for s in re.split(r"(?<=[.!?؟])\s+", text) if s.strip()]
+    sentences = [s.strip() for s in SENTENCE_SPLIT_RE.split(text) if s.strip()]
     lines = [line.strip("-• \t") for line in text.splitlines() if line.strip()]
     core = lines[:4] if len(lines) >= 2 else sentences[:4]
     if not core:
@@ -2089,6 +2421,9 @@ AI_STOPWORDS_AR = {
     "هذا", "هذه", "ذلك", "تلك", "الذي", "التي", "الذين", "اللاتي", "اللواتي", "ال", "ثم",
     "مع", "كان", "كانت", "يكون", "تكون", "أن", "إن", "لكن", "أو", "و", "لا", "نعم",
 }
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?؟])\s+")
+KEY_TERM_TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z0-9'-]{2,}|[\u0600-\u06FF]{2,}|\d+(?:\.\d+)?")
+NUMERIC_TOKEN_RE = re.compile(r"\d+(?:\.\d+)?")
 LOCAL_GENERIC_DISTRACTORS = {
     "en": [
         "A different concept",
@@ -2114,12 +2449,12 @@ def split_local_units(text: str) -> List[str]:
     lines = [line.strip("-• \t") for line in (text or "").splitlines() if line.strip()]
     if len(lines) >= 2:
         return lines
-    sentences = [s.strip() for s in re.split(r"(?<=[.!?؟])\s+", clean) if s.strip()]
+    sentences = [s.strip() for s in SENTENCE_SPLIT_RE.split(clean) if s.strip()]
     return sentences if sentences else [clean]
 
 
 def extract_key_terms(text: str, limit: int = 8) -> List[str]:
-    raw_tokens = re.findall(r"[A-Za-z][A-Za-z0-9'-]{2,}|[\u0600-\u06FF]{2,}|\d+(?:\.\d+)?", text or "")
+    raw_tokens = KEY_TERM_TOKEN_RE.findall(text or "")
     tokens: List[Tuple[int, str, str]] = []
     for index, raw in enumerate(raw_tokens):
         token = raw.strip("'-_")
@@ -2128,7 +2463,7 @@ def extract_key_terms(text: str, limit: int = 8) -> List[str]:
         norm = token.lower()
         if norm in AI_STOPWORDS_EN or norm in AI_STOPWORDS_AR:
             continue
-        if len(norm) < 3 and not re.fullmatch(r"\d+(?:\.\d+)?", norm):
+        if len(norm) < 3 and not NUMERIC_TOKEN_RE.fullmatch(norm):
             continue
         tokens.append((index, token, norm))
 
@@ -2146,7 +2481,7 @@ def extract_key_terms(text: str, limit: int = 8) -> List[str]:
         weight = 1.0
         if token[:1].isupper() and token[1:].islower():
             weight += 0.2
-        if re.fullmatch(r"\d+(?:\.\d+)?", token):
+        if NUMERIC_TOKEN_RE.fullmatch(token):
             weight += 0.35
         if len(token) >= 8:
             weight += 0.1
@@ -2183,7 +2518,7 @@ def extract_key_terms(text: str, limit: int = 8) -> List[str]:
 
 
 def _normalize_for_compare(value: str) -> str:
-    return re.sub(r"\s+", " ", (value or "").strip().lower())
+    return WHITESPACE_RUN_RE.sub(" ", (value or "").strip().lower())
 
 
 def _build_local_options(answer: str, pool: List[str], lang: str) -> Tuple[List[str], int]:
@@ -2526,18 +2861,16 @@ async def maybe_send_group_interlude(
         return
     interval = max(1, min(30, int(owner_settings.fun_interval or 6)))
     key = str(target)
-    should_fire = False
-    async with group_interlude_lock:
-        state = group_interlude_state[key]
-        state["count"] = int(state.get("count", 0)) + 1
-        if state["count"] >= interval:
-            now = int(time.time())
-            if now - int(state.get("last", 0)) >= 45:
-                state["count"] = 0
-                state["last"] = now
-                should_fire = True
-    if not should_fire:
+    # No await between the read and the update, so this is atomic on the event loop.
+    state = group_interlude_state[key]
+    state["count"] = int(state.get("count", 0)) + 1
+    if state["count"] < interval:
+        return
+    now = time.monotonic()
+    if now - state["last"] < 45:
         return
+    state["count"] = 0
+    state["last"] = now
 
     selected_style = normalize_fun_style(owner_settings.fun_style)
     if selected_style == "mixed":
@@ -2564,18 +2897,32 @@ async def maybe_send_group_interlude(
         await context.bot.send_message(chat_id=target, text=f"{header}: {text}")
 
 
-async def resolve_target_chat(bot, target: Target) -> Optional[Tuple[Target, str]]:
+async def fetch_target_chat_info(bot, target: Target) -> Optional[Tuple[Target, str, str]]:
+    cache_key = str(target)
+    now = time.monotonic()
+    cached = chat_info_cache.get(cache_key)
+    if cached and now - cached[0] < CHAT_INFO_CACHE_TTL:
+        return cached[1], cached[2], cached[3]
     try:
         chat = await bot.get_chat(target)
-        return chat.id, resolve_chat_title(chat)
-    except Exception:
-        if isinstance(target, int):
-            try:
-                chat = await bot.get_chat(target)
-                return chat.id, resolve_chat_title(chat)
-            except Exception:
-                return None
+    except telegram.error.TelegramError:
+        if not isinstance(target, int):
+            return None
+        try:
+            chat = await bot.get_chat(target)
+        except telegram.error.TelegramError:
+            return None
+    info = (chat.id, resolve_chat_title(chat), getattr(chat, "type", "") or "")
+    chat_info_cache[cache_key] = (now, *info)
+    chat_info_cache[str(chat.id)] = (now, *info)
+    return info
+
+
+async def resolve_target_chat(bot, target: Target) -> Optional[Tuple[Target, str]]:
+    info = await fetch_target_chat_info(bot, target)
+    if info is None:
         return None
+    return info[0], info[1]
 
 
 async def resolve_target_chat_type(bot, target: Target) -> str:
@@ -2583,23 +2930,18 @@ async def resolve_target_chat_type(bot, target: Target) -> str:
     cached = chat_type_cache.get(cache_key)
     if cached:
         return cached
-    try:
-        chat = await bot.get_chat(target)
-    except Exception:
-        if isinstance(target, int):
-            try:
-                chat = await bot.get_chat(target)
-            except Exception:
-                return ""
-        else:
-            return ""
-    chat_type = getattr(chat, "type", "") or ""
+    info = await fetch_target_chat_info(bot, target)
+    if info is None:
+        return ""
+    chat_id, _, chat_type = info
     if chat_type:
         chat_type_cache[cache_key] = chat_type
-        chat_type_cache[str(chat.id)] = chat_type
+        chat_type_cache[str(chat_id)] = chat_type
     return chat_type
 
 
+# Markups are immutable in PTB 20+, so one instance per language can be shared.
+@lru_cache(maxsize=8)
 def build_main_keyboard(lang: str) -> InlineKeyboardMarkup:
     buttons = [
         [InlineKeyboardButton("⚙️ Settings" if lang == "en" else "⚙️ الإعدادات", callback_data="settings")],
@@ -2650,7 +2992,7 @@ def build_controls_keyboard(lang: str, settings: UserSettings) -> InlineKeyboard
         ],
         [
             InlineKeyboardButton(_selected_label(f"Explain {'ON' if settings.show_explanation else 'OFF'}" if lang == "en" else f"الشرح {'مفعل' if settings.show_explanation else 'متوقف'}", settings.show_explanation), callback_data="toggle:explain"),
-            InlineKeyboardButton(_selected_label(f"Confirm {'ON' if settings.confirmation_message else 'OFF'}" if lang == "en" else f"التأكيد {'مفعل' if settings.confirmation_message else 'متوقف'}", settings.confirmation_message), callback_data="toggle:confirm"),
+            InlineKeyboardButton(_selected_label(f"Buttons {'ON' if settings.confirmation_message else 'OFF'}" if lang == "en" else f"الأزرار {'مفعلة' if settings.confirmation_message else 'متوقفة'}", settings.confirmation_message), callback_data="toggle:confirm"),
             InlineKeyboardButton("🩺 AI status" if lang == "en" else "🩺 حالة الذكاء", callback_data="panel:ai"),
         ],
         [
@@ -3232,6 +3574,18 @@ def build_external_share_rows(preview_url: str, quiz_id: str, question: str, lan
     ]
 
 
+async def get_bot_identity(context: ContextTypes.DEFAULT_TYPE) -> Tuple[int, str]:
+    bot_id = context.bot_data.get("bot_id")
+    bot_username = context.bot_data.get("bot_username")
+    if not bot_id or not bot_username:
+        # Bot.initialize() already fetched getMe; reuse the cached user instead of another round trip.
+        bot_id = context.bot.id
+        bot_username = context.bot.username or ""
+        context.bot_data["bot_id"] = bot_id
+        context.bot_data["bot_username"] = bot_username
+    return bot_id, bot_username
+
+
 async def build_quiz_keyboard(
     context: ContextTypes.DEFAULT_TYPE,
     quiz_id: str,
@@ -3240,11 +3594,7 @@ async def build_quiz_keyboard(
     share_mode: str,
     question: str,
 ) -> InlineKeyboardMarkup:
-    bot_username = context.bot_data.get("bot_username")
-    if not bot_username:
-        me = await context.bot.get_me()
-        bot_username = me.username
-        context.bot_data["bot_username"] = bot_username
+    _, bot_username = await get_bot_identity(context)
 
     buttons = []
     if bot_username and share_mode in {"telegram", "both"}:
@@ -3284,11 +3634,64 @@ def prepare_quiz_poll_payload(item: SendItem, target: Target) -> Tuple[List[str]
     rnd = random.Random(int.from_bytes(seed_bytes[:8], "big"))
     rnd.shuffle(distractors)
 
-    shuffled = distractors[:desired_position] + [correct_option] + distractors[desired_position:]
-    if len(shuffled) != len(options):
-        shuffled = options
-        desired_position = correct_index
-    return shuffled, desired_position
+    return distractors[:desired_position] + [correct_option] + distractors[desired_position:], desired_position
+
+
+# Substrings of Telegram BadRequest texts that blame the inline keyboard rather
+# than the poll itself (BUTTON_URL_INVALID, "Wrong http url specified", ...).
+REPLY_MARKUP_ERROR_MARKERS = ("button", "reply markup", "reply_markup", "inline keyboard", "http url")
+
+
+def is_reply_markup_error(exc: telegram.error.BadRequest) -> bool:
+    message = str(exc).lower()
+    return any(marker in message for marker in REPLY_MARKUP_ERROR_MARKERS)
+
+
+def retry_after_seconds(exc: telegram.error.RetryAfter) -> float:
+    value = getattr(exc, "retry_after", 1) or 1
+    if hasattr(value, "total_seconds"):
+        value = value.total_seconds()
+    return max(0.0, float(value))
+
+
+async def send_poll_with_retry(bot, chat_type: str, **kwargs) -> Message:
+    attempt = 1
+    while True:
+        # Wait for the rate-limit token (and any flood-control pause) before taking
+        # a global slot, so a throttled target never pins one while it sleeps.
+        await send_rate_limiter.acquire(kwargs["chat_id"], chat_type)
+        try:
+            async with global_send_semaphore:
+                return await bot.send_poll(**kwargs)
+        except telegram.error.RetryAfter as exc:
+            if attempt >= SEND_RETRY_ATTEMPTS:
+                raise
+            attempt += 1
+            delay = retry_after_seconds(exc)
+            send_rate_limiter.pause(delay)
+            logger.warning("Flood control for %s, retrying in %.1fs", kwargs.get("chat_id"), delay)
+
+
+def retire_sender(target: Target) -> None:
+    current = asyncio.current_task()
+    remaining = [task for task in sender_tasks.get(target, []) if task is not current and not task.done()]
+    queue = send_queues.get(target)
+    if remaining:
+        sender_tasks[target] = remaining
+        return
+    sender_tasks.pop(target, None)
+    if queue is not None and queue.empty():
+        send_queues.pop(target, None)
+
+
+def spawn_background_task(coro) -> asyncio.Task:
+    # The loop only keeps weak references to tasks; hold them until they finish.
+    # Application.create_task is avoided on purpose: stop() would wait for
+    # long-lived workers before post_shutdown gets a chance to cancel them.
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
 
 
 def ensure_sender(target: Target, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -3297,107 +3700,129 @@ def ensure_sender(target: Target, context: ContextTypes.DEFAULT_TYPE) -> None:
     target_sender_limit = 1 if PRESERVE_TARGET_ORDER else max(1, MAX_CONCURRENT_SEND)
     missing = target_sender_limit - len(active_tasks)
     for worker_idx in range(missing):
-        task = context.application.create_task(_sender(target, context, worker_idx + len(active_tasks) + 1))
+        task = spawn_background_task(_sender(target, context, worker_idx + len(active_tasks) + 1))
         sender_tasks[target].append(task)
 
 
 async def _sender(target: Target, context: ContextTypes.DEFAULT_TYPE, worker_idx: int) -> None:
     logger.info("Sender task started for target %s worker %s", target, worker_idx)
     try:
+        idle_timeout = SENDER_IDLE_TIMEOUT if SENDER_IDLE_TIMEOUT > 0 else None
         while True:
-            item: SendItem = await send_queues[target].get()
-            async with global_send_semaphore:
-                try:
-                    target_chat_type = await resolve_target_chat_type(context.bot, target)
-                    poll_options, poll_correct_index = prepare_quiz_poll_payload(item, target)
-                    sent_message = await context.bot.send_poll(
-                        chat_id=target,
-                        question=item.question,
-                        options=poll_options,
-                        type=Poll.QUIZ,
-                        correct_option_id=poll_correct_index,
-                        is_anonymous=target_chat_type == ChatType.CHANNEL,
-                    )
-
-                    await save_quiz(
+            queue = send_queues[target]
+            try:
+                item: SendItem = await asyncio.wait_for(queue.get(), timeout=idle_timeout)
+            except asyncio.TimeoutError:
+                if not queue.empty():
+                    continue
+                retire_sender(target)
+                logger.info("Sender task retired for target %s worker %s after idling", target, worker_idx)
+                return
+            # Pacing and error backoff sleep outside global_send_semaphore, which
+            # send_poll_with_retry holds only around the actual request.
+            cooldown = 0.0
+            try:
+                target_chat_type = await resolve_target_chat_type(context.bot, target)
+                poll_options, poll_correct_index = prepare_quiz_poll_payload(item, target)
+                owner_settings = await get_user_settings(item.owner_user_id) if item.owner_user_id else UserSettings(
+                    None,
+                    "",
+                    DEFAULT_DELETE_SOURCE,
+                    True,
+                    OPENAI_MODEL,
+                    "auto",
+                    AI_DEFAULT_COUNT,
+                    "auto",
+                    "",
+                    "rich",
+                    "both",
+                    True,
+                    QUIZ_CONFIRMATION_MESSAGE,
+                    "quiz",
+                    False,
+                    6,
+                    "mixed",
+                )
+                poll_kwargs = dict(
+                    chat_id=target,
+                    question=item.question,
+                    options=poll_options,
+                    type=Poll.QUIZ,
+                    correct_option_id=poll_correct_index,
+                    is_anonymous=target_chat_type == ChatType.CHANNEL,
+                )
+                # The share/repost/explain buttons ride on the poll itself rather
+                # than a follow-up message, so each quiz costs one API call.
+                keyboard = None
+                if owner_settings.confirmation_message and owner_settings.delivery_mode != "fast":
+                    keyboard = await build_quiz_keyboard(
+                        context,
                         quiz_id=item.quiz_id,
+                        lang=item.lang,
+                        include_explanation=bool(item.explanation) and owner_settings.show_explanation,
+                        share_mode=owner_settings.share_mode,
                         question=item.question,
-                        options=poll_options,
-                        correct_option=poll_correct_index,
-                        user_id=item.owner_user_id,
-                        explanation=item.explanation,
-                    )
-                    owner_settings = await get_user_settings(item.owner_user_id) if item.owner_user_id else UserSettings(
-                        None,
-                        "",
-                        DEFAULT_DELETE_SOURCE,
-                        True,
-                        OPENAI_MODEL,
-                        "auto",
-                        AI_DEFAULT_COUNT,
-                        "auto",
-                        "",
-                        "rich",
-                        "both",
-                        True,
-                        QUIZ_CONFIRMATION_MESSAGE,
-                        "quiz",
-                        False,
-                        6,
-                        "mixed",
                     )
+                try:
+                    sent_message = await send_poll_with_retry(context.bot, target_chat_type, reply_markup=keyboard, **poll_kwargs)
+                except telegram.error.BadRequest as exc:
+                    if keyboard is None or not is_reply_markup_error(exc):
+                        raise
+                    # A rejected button (e.g. an unreachable preview URL) must not cost the quiz.
+                    sent_message = await send_poll_with_retry(context.bot, target_chat_type, **poll_kwargs)
+
+                await save_quiz(
+                    quiz_id=item.quiz_id,
+                    question=item.question,
+                    options=poll_options,
+                    correct_option=poll_correct_index,
+                    user_id=item.owner_user_id,
+                    explanation=item.explanation,
+                )
 
-                    if item.delete_source and item.source_chat_id and item.source_message_id:
-                        delete_key = (item.source_chat_id, item.source_message_id)
-                        if (
-                            delete_key not in deleted_source_messages
-                            and should_delete_source_message(item.delete_source, item.source_chat_type, item.source_chat_id)
-                        ):
-                            with contextlib.suppress(Exception):
-                                await context.bot.delete_message(chat_id=item.source_chat_id, message_id=item.source_message_id)
-                                deleted_source_messages.add(delete_key)
-                                if len(deleted_source_messages) > 5000:
-                                    deleted_source_messages.clear()
-
-                    await record_stats(
-                        user_id=item.owner_user_id,
-                        target=target,
-                        chat_type=sent_message.chat.type,
-                        title=resolve_chat_title(sent_message.chat),
-                    )
+                if item.delete_source and item.source_chat_id and item.source_message_id:
+                    delete_key = (item.source_chat_id, item.source_message_id)
+                    if (
+                        delete_key not in deleted_source_messages
+                        and should_delete_source_message(item.delete_source, item.source_chat_type, item.source_chat_id)
+                    ):
+                        with contextlib.suppress(telegram.error.TelegramError):
+                            await context.bot.delete_message(chat_id=item.source_chat_id, message_id=item.source_message_id)
+                            deleted_source_messages[delete_key] = True
+
+                await record_stats(
+                    user_id=item.owner_user_id,
+                    target=target,
+                    chat_type=sent_message.chat.type,
+                    title=resolve_chat_title(sent_message.chat),
+                )
 
-                    if owner_settings.confirmation_message and owner_settings.delivery_mode != "fast":
-                        keyboard = await build_quiz_keyboard(
-                            context,
-                            quiz_id=item.quiz_id,
-                            lang=item.lang,
-                            include_explanation=bool(item.explanation) and owner_settings.show_explanation,
-                            share_mode=owner_settings.share_mode,
-                            question=item.question,
-                        )
-                        with contextlib.suppress(Exception):
-                            await context.bot.send_message(
-                                chat_id=target,
-                                text=get_text("quiz_sent", item.lang),
-                                reply_markup=keyboard,
-                            )
-
-                    await maybe_send_group_interlude(context, target, target_chat_type, owner_settings, item.lang)
-
-                    wait_interval = FAST_SEND_INTERVAL if owner_settings.delivery_mode == "fast" else SEND_INTERVAL
-                    if wait_interval > 0:
-                        await asyncio.sleep(wait_interval)
-                except telegram.error.BadRequest as exc:
-                    logger.warning("BadRequest while sending poll to %s: %s", target, exc)
-                    await asyncio.sleep(1)
-                except Exception as exc:  # pragma: no cover - runtime/network branch
-                    logger.exception("Error sending poll to %s: %s", target, exc)
-                    await asyncio.sleep(3)
+                await maybe_send_group_interlude(context, target, target_chat_type, owner_settings, item.lang)
+
+                cooldown = FAST_SEND_INTERVAL if owner_settings.delivery_mode == "fast" else SEND_INTERVAL
+            except telegram.error.RetryAfter as exc:
+                send_rate_limiter.pause(retry_after_seconds(exc))
+                logger.warning("Dropping poll for %s after repeated flood control: %s", target, exc)
+            except telegram.error.BadRequest as exc:
+                logger.warning("BadRequest while sending poll to %s: %s", target, exc)
+                cooldown = 1
+            except (telegram.error.TelegramError, aiosqlite.Error) as exc:
+                logger.warning("Error sending poll to %s: %s", target, exc)
+                cooldown = 3
+            except Exception as exc:  # pragma: no cover - unexpected bug, keep the worker alive
+                logger.exception("Error sending poll to %s: %s", target, exc)
+                cooldown = 3
+            if cooldown > 0:
+                await asyncio.sleep(cooldown)
     except asyncio.CancelledError:
         logger.info("Sender task cancelled for %s worker %s", target, worker_idx)
         raise
 
 
+def make_quiz_id(question: str, options: List[str]) -> str:
+    return hashlib.blake2b((question + ":::" + ":::".join(options)).encode(), digest_size=16).hexdigest()
+
+
 async def enqueue_quiz_items(
     target: Target,
     quizzes: List[Tuple[str, List[str], int, str]],
@@ -3408,18 +3833,27 @@ async def enqueue_quiz_items(
     source_chat_type: str = "",
     source_message_id: Optional[int] = None,
     delete_source: bool = False,
+    quiz_id: Optional[str] = None,
 ) -> int:
+    valid_quizzes = [quiz for quiz in quizzes if validate_mcq(quiz[0], quiz[1])]
+    if not valid_quizzes:
+        return 0
+    # Check capacity without the defaultdict: a rejected batch must not leave an
+    # empty queue behind that no sender will ever retire.
+    existing = send_queues.get(target)
+    pending = existing.qsize() if existing is not None else 0
+    if MAX_QUEUE_SIZE > 0 and MAX_QUEUE_SIZE - pending < len(valid_quizzes):
+        raise asyncio.QueueFull
+    queue = send_queues[target]
+    ensure_sender(target, context)
     queued = 0
-    for question, options, correct_index, explanation in quizzes:
-        if not validate_mcq(question, options):
-            continue
-        quiz_id = hashlib.md5((question + ":::" + ":::".join(options)).encode()).hexdigest()
-        await send_queues[target].put(
+    for question, options, correct_index, explanation in valid_quizzes:
+        queue.put_nowait(
             SendItem(
                 question=question,
                 options=options,
                 correct_index=correct_index,
-                quiz_id=quiz_id,
+                quiz_id=quiz_id or make_quiz_id(question, options),
                 explanation=explanation,
                 owner_user_id=owner_user_id,
                 source_chat_id=source_chat_id,
@@ -3430,8 +3864,6 @@ async def enqueue_quiz_items(
             )
         )
         queued += 1
-    if queued:
-        ensure_sender(target, context)
     return queued
 
 
@@ -3444,6 +3876,7 @@ async def enqueue_mcq(
     is_private: bool = False,
     notify_fail: bool = False,
     text_override: Optional[str] = None,
+    lang: Optional[str] = None,
 ) -> bool:
     raw_message_text = extract_message_text(message)
     try:
@@ -3452,13 +3885,18 @@ async def enqueue_mcq(
         )
     except Exception:
         settings = UserSettings(None, "", DEFAULT_DELETE_SOURCE, True, OPENAI_MODEL, "auto", AI_DEFAULT_COUNT, "auto", "", "rich", "both", True, QUIZ_CONFIRMATION_MESSAGE, "quiz", False, 6, "mixed")
-    lang = settings.preferred_language if settings.preferred_language in {"ar", "en"} else infer_lang(getattr(message.from_user, "language_code", None), raw_message_text)
+    if lang is None:
+        # Handlers pass the language they already resolved; langdetect is the
+        # expensive part of this and should run once per message.
+        lang = settings.preferred_language if settings.preferred_language in {"ar", "en"} else infer_lang(getattr(message.from_user, "language_code", None), raw_message_text)
 
     target = explicit_target or settings.default_target or message.chat.id
     raw_text = text_override if text_override is not None else raw_message_text
 
     try:
-        results = parse_mcq(raw_text)
+        # Parsing is pure CPU work; keep it off the event loop so long batches
+        # do not stall polling and the sender workers.
+        results = await asyncio.to_thread(parse_mcq, raw_text)
     except Exception as exc:
         logger.exception("Parsing failed: %s", exc)
         if notify_fail:
@@ -3495,13 +3933,15 @@ async def enqueue_mcq(
     return True
 
 
-def message_targets_bot(message: Message, bot_id: int, bot_username: str) -> bool:
+def message_targets_bot(message: Message, bot_id: int, bot_username: str, text: Optional[str] = None) -> bool:
     if not message:
         return False
     if message.reply_to_message and message.reply_to_message.from_user and message.reply_to_message.from_user.id == bot_id:
         return True
-    text = extract_message_text(message).lower()
-    return f"@{bot_username.lower()}" in text
+    if not bot_username:
+        return False
+    text = extract_message_text(message) if text is None else text
+    return "@" in text and get_bot_mention_re(bot_username).search(text) is not None
 
 
 async def show_settings(target_message: Message, user_id: int, lang: str) -> None:
@@ -3522,18 +3962,23 @@ async def edit_panel(query, user_id: int, lang: str, panel: str) -> None:
     await query.edit_message_text(text, reply_markup=markup)
 
 
-async def show_stats(target_message: Message, user_id: int, lang: str) -> None:
+async def build_stats_text(user_id: int, lang: str) -> str:
+    # Settings and the global total are served from memory; only the
+    # per-user counter needs a query.
     settings = await get_user_settings(user_id)
     conn = await DB.conn()
     user_row = await (await conn.execute("SELECT sent FROM user_stats WHERE user_id=?", (user_id,))).fetchone()
-    total_row = await (await conn.execute("SELECT COALESCE(SUM(sent), 0) AS sent FROM target_stats")).fetchone()
-    text = get_text(
+    return get_text(
         "stats",
         lang,
         private_count=user_row["sent"] if user_row else 0,
-        total_targets=total_row["sent"] if total_row else 0,
+        total_targets=await fetch_total_sent(),
         target=format_target_label(settings.default_target, settings.default_target_title, lang),
     )
+
+
+async def show_stats(target_message: Message, user_id: int, lang: str) -> None:
+    text = await build_stats_text(user_id, lang)
     await send_text_reply(target_message, text, reply_markup=build_main_keyboard(lang))
 
 
@@ -3560,6 +4005,7 @@ async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
                 source_chat_id=None,
                 source_message_id=None,
                 delete_source=False,
+                quiz_id=quiz_id,
             )
             await send_text_reply(message, get_text("quiz_loaded", lang))
         except asyncio.QueueFull:
@@ -4411,17 +4857,7 @@ async def callback_query_handler(update: Update, context: ContextTypes.DEFAULT_T
             await query.answer(get_text("unsupported", lang), show_alert=True)
         return
     if data == "stats" and user:
-        conn = await DB.conn()
-        settings = await get_user_settings(user.id)
-        user_row = await (await conn.execute("SELECT sent FROM user_stats WHERE user_id=?", (user.id,))).fetchone()
-        total_row = await (await conn.execute("SELECT COALESCE(SUM(sent), 0) AS sent FROM target_stats")).fetchone()
-        text = get_text(
-            "stats",
-            lang,
-            private_count=user_row["sent"] if user_row else 0,
-            total_targets=total_row["sent"] if total_row else 0,
-            target=format_target_label(settings.default_target, settings.default_target_title, lang),
-        )
+        text = await build_stats_text(user.id, lang)
         with contextlib.suppress(Exception):
             await query.edit_message_text(text, reply_markup=build_main_keyboard(lang))
         return
@@ -4445,6 +4881,7 @@ async def callback_query_handler(update: Update, context: ContextTypes.DEFAULT_T
                 source_chat_id=None,
                 source_message_id=None,
                 delete_source=False,
+                quiz_id=quiz_id,
             )
             with contextlib.suppress(Exception):
                 await query.answer(get_text("quiz_loaded", lang), show_alert=False)
@@ -4484,9 +4921,9 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     if not raw_text:
         return
 
-    lang = await resolve_user_lang(user.id, getattr(user, "language_code", None), raw_text) if user else infer_lang(None, raw_text)
-    inline_request = detect_inline_ai_request(raw_text)
     if chat.type == ChatType.PRIVATE:
+        lang = await resolve_user_lang(user.id, getattr(user, "language_code", None), raw_text) if user else infer_lang(None, raw_text)
+        inline_request = detect_inline_ai_request(raw_text)
         if inline_request and user:
             await run_ai_flow(
                 message=message,
@@ -4497,46 +4934,22 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
                 payload=inline_request[1],
             )
             return
-        await enqueue_mcq(message, context, owner_user_id=user.id if user else 0, is_private=True, notify_fail=True)
+        await enqueue_mcq(message, context, owner_user_id=user.id if user else 0, is_private=True, notify_fail=True, lang=lang)
         return
 
-    bot_username = context.bot_data.get("bot_username")
-    bot_id = context.bot_data.get("bot_id")
-    if not bot_username or not bot_id:
-        me = await context.bot.get_me()
-        bot_username = me.username
-        bot_id = me.id
-        context.bot_data["bot_username"] = bot_username
-        context.bot_data["bot_id"] = bot_id
-
-    targeted = message_targets_bot(message, bot_id, bot_username)
+    bot_id, bot_username = await get_bot_identity(context)
+    targeted = message_targets_bot(message, bot_id, bot_username, raw_text)
     cleaned_text = remove_bot_mentions(raw_text, bot_username) if targeted else raw_text
     inline_request = detect_inline_ai_request(cleaned_text)
     if not targeted:
-        if GROUP_AUTO_PARSE_MCQS and inline_request and user:
-            await run_ai_flow(
-                message=message,
-                context=context,
-                owner_user_id=user.id,
-                lang=lang,
-                mode=inline_request[0],
-                payload=inline_request[1],
-                explicit_target=chat.id,
-            )
+        # Unmentioned group messages only matter for auto-parsing; cleaned_text
+        # equals raw_text here, so the shared tail below handles both cases.
+        if not GROUP_AUTO_PARSE_MCQS:
             return
-        if GROUP_AUTO_PARSE_MCQS and looks_like_mcq_batch(raw_text):
-            await enqueue_mcq(
-                message,
-                context,
-                explicit_target=chat.id,
-                owner_user_id=user.id if user else 0,
-                is_private=False,
-                notify_fail=True,
-                text_override=raw_text,
-            )
+        if not (inline_request and user) and not looks_like_mcq_batch(raw_text):
             return
-        return
 
+    lang = await resolve_user_lang(user.id, getattr(user, "language_code", None), raw_text) if user else infer_lang(None, raw_text)
     if inline_request and user:
         await run_ai_flow(
             message=message,
@@ -4557,6 +4970,7 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         is_private=False,
         notify_fail=True,
         text_override=cleaned_text,
+        lang=lang,
     )
 
 
@@ -4569,12 +4983,10 @@ async def handle_channel_post(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
 
     lang = infer_lang(None, text)
-    conn = await DB.conn()
-    await conn.execute(
-        "INSERT OR IGNORE INTO known_channels(chat_id, title) VALUES (?, ?)",
-        (post.chat.id, resolve_chat_title(post.chat)),
-    )
-    await conn.commit()
+    if post.chat.id not in known_channel_ids:
+        conn = await DB.conn()
+        if await remember_known_channel(conn, post.chat.id, resolve_chat_title(post.chat)):
+            await conn.commit()
 
     inline_request = detect_inline_ai_request(text)
     if inline_request:
@@ -4589,7 +5001,7 @@ async def handle_channel_post(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         return
 
-    await enqueue_mcq(post, context, explicit_target=post.chat.id, owner_user_id=0, is_private=False, notify_fail=True)
+    await enqueue_mcq(post, context, explicit_target=post.chat.id, owner_user_id=0, is_private=False, notify_fail=True, lang=lang)
 
 
 async def schedule_cleanup() -> None:
@@ -4598,8 +5010,20 @@ async def schedule_cleanup() -> None:
         try:
             conn = await DB.conn()
             ninety_days_ago = int(time.time()) - (90 * 24 * 60 * 60)
-            await conn.execute("DELETE FROM quizzes WHERE created_at > 0 AND created_at < ?", (ninety_days_ago,))
-            await conn.commit()
+            # Delete in short batches so the write lock is released between them
+            # and senders/handlers sharing the connection are not stalled.
+            while True:
+                cursor = await conn.execute(
+                    "DELETE FROM quizzes WHERE rowid IN ("
+                    "SELECT rowid FROM quizzes WHERE created_at > 0 AND created_at < ? LIMIT ?)",
+                    (ninety_days_ago, CLEANUP_DELETE_BATCH),
+                )
+                await conn.commit()
+                if cursor.rowcount < CLEANUP_DELETE_BATCH:
+                    break
+                await asyncio.sleep(0.1)
+            quiz_cache.clear()
+            await conn.execute("PRAGMA optimize")
             log_memory_usage()
             logger.info("Cleanup completed")
         except Exception as exc:
@@ -4608,23 +5032,39 @@ async def schedule_cleanup() -> None:
 
 async def post_init(app) -> None:
     await init_db()
-    me = await app.bot.get_me()
-    app.bot_data["bot_username"] = me.username or ""
-    app.bot_data["bot_id"] = me.id
+    app.bot_data["bot_username"] = app.bot.username or ""
+    app.bot_data["bot_id"] = app.bot.id
     if ENABLE_WEB_PREVIEW and keep_alive is not None:
         with contextlib.suppress(Exception):
             keep_alive()
-    app.create_task(schedule_cleanup())
+    app.bot_data["cleanup_task"] = spawn_background_task(schedule_cleanup())
+    app.bot_data["stats_writer_task"] = spawn_background_task(stats_writer())
     logger.info("Bot initialized")
 
 
 async def on_shutdown(app) -> None:
     logger.info("Shutting down bot...")
     all_tasks = [task for tasks in sender_tasks.values() for task in tasks]
+    cleanup_task = app.bot_data.get("cleanup_task")
+    if cleanup_task is not None:
+        all_tasks.append(cleanup_task)
     for task in all_tasks:
         task.cancel()
     if all_tasks:
         await asyncio.gather(*all_tasks, return_exceptions=True)
+    stats_writer_task = app.bot_data.get("stats_writer_task")
+    if stats_writer_task is not None and not stats_writer_task.done():
+        stats_queue.put_nowait(None)
+        with contextlib.suppress(Exception):
+            await stats_writer_task
+    leftover_stats = []
+    while not stats_queue.empty():
+        entry = stats_queue.get_nowait()
+        if entry is not None:
+            leftover_stats.append(entry)
+    if leftover_stats:
+        with contextlib.suppress(Exception):
+            await write_stats_batch(leftover_stats)
     await DB.close()
     logger.info("Shutdown complete")
 
@@ -4634,6 +5074,11 @@ def main() -> None:
     if not token:
         raise RuntimeError("TELEGRAM_BOT_TOKEN is missing")
 
+    if USE_UVLOOP and uvloop is not None:
+        # run_polling builds its loop from the active policy.
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Using uvloop event loop")
+
     builder = ApplicationBuilder().token(token).post_init(post_init)
     if hasattr(builder, "concurrent_updates"):
         builder = builder.concurrent_updates(CONCURRENT_UPDATES)
@@ -4649,6 +5094,19 @@ def main() -> None:
         builder = builder.write_timeout(60.0)
     if hasattr(builder, "post_shutdown"):
         builder = builder.post_shutdown(on_shutdown)
+    if USE_PTB_RATE_LIMITER and AIORateLimiter is not None:
+        try:
+            rate_limiter = AIORateLimiter(
+                overall_max_rate=GLOBAL_SEND_RATE,
+                group_max_rate=GROUP_SEND_RATE_PER_MINUTE,
+                # send_poll_with_retry is the only RetryAfter retry layer.
+                max_retries=0,
+            )
+        except RuntimeError as exc:
+            logger.warning("AIORateLimiter unavailable, using the built-in send limiter: %s", exc)
+        else:
+            builder = builder.rate_limiter(rate_limiter)
+            send_rate_limiter.disable()
     app = builder.build()
 
     app.add_handler(CommandHandler("start", start_handler))
@@ -4690,7 +5148,16 @@ def main() -> None:
     app.add_handler(CallbackQueryHandler(callback_query_handler))
     app.add_handler(MessageHandler(filters.UpdateType.CHANNEL_POST & filters.ChatType.CHANNEL & (filters.TEXT | filters.Caption), handle_channel_post))
     app.add_handler(MessageHandler(filters.UpdateType.EDITED_CHANNEL_POST & filters.ChatType.CHANNEL & (filters.TEXT | filters.Caption), handle_channel_post))
-    app.add_handler(MessageHandler((filters.TEXT | filters.Caption) & ~filters.COMMAND, handle_text))
+    text_filter = (filters.TEXT | filters.Caption) & ~filters.COMMAND & ~filters.UpdateType.CHANNEL_POSTS
+    if not GROUP_AUTO_PARSE_MCQS:
+        # Groups can only reach the bot by mention or reply; drop the rest at dispatch.
+        text_filter &= (
+            filters.ChatType.PRIVATE
+            | filters.REPLY
+            | filters.Entity(MessageEntity.MENTION)
+            | filters.CaptionEntity(MessageEntity.MENTION)
+        )
+    app.add_handler(MessageHandler(text_filter, handle_text))
 
     logger.info("Bot is starting...")
     app.run_polling(
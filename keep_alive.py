@@ -2,6 +2,7 @@ import html
 import json
 import os
 import sqlite3
+import urllib.parse
 from threading import Thread
 
 from flask import Flask, request
@@ -45,17 +46,7 @@ PUBLIC_BASE_URL = resolve_public_base_url()
 
 
 def quote_plus(value: str) -> str:
-    safe_chars = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_.~"
-    out = []
-    for char in value or "":
-        if char == " ":
-            out.append("+")
-        elif char in safe_chars:
-            out.append(char)
-        else:
-            for byte in char.encode("utf-8"):
-                out.append(f"%{byte:02X}")
-    return "".join(out)
+    return urllib.parse.quote_plus(value or "", safe="")
 
 
 def fetch_quiz(quiz_id: str):
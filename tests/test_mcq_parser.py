@@ -0,0 +1,23 @@
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture(params=["re", "auto"])
+def bot_module(request, monkeypatch):
+    monkeypatch.setenv("MCQ_REGEX_ENGINE", request.param)
+    sys.modules.pop("Co_mcq", None)
+    module = importlib.import_module("Co_mcq")
+    yield module
+    sys.modules.pop("Co_mcq", None)
+
+
+def test_sub_block_split_recovers_question_after_zero_width_line(bot_module):
+    # The lookahead re-split spans newlines, so it finds the "٢" question start
+    # that the line-based block scan folds into the previous block.
+    text = "False |\nqux\n\n​\n٢ \n (a) ب)  a.\n٢ \n -  \n صح \n "
+    assert bot_module.parse_mcq(text) == [("٢", ["صح", "خطأ"], 0)]